@@ -1,8 +1,28 @@
 import wx
-import wx.lib.mixins.listctrl as listmix
-from pathlib import Path
 import sys
 import os
+import threading
+import re
+from datetime import date as _date
+
+_RE_DEADLINE = re.compile(r'Срок:\s*(\d{2}\.\d{2}\.\d{4})')
+
+
+def check_deadline(deadline_str, today=None):
+    """Проверяет, наступил ли срок в формате ДД.ММ.ГГГГ"""
+    today = today or _date.today()
+    try:
+        d, m, y = int(deadline_str[0:2]), int(deadline_str[3:5]), int(deadline_str[6:10])
+        return _date(y, m, d) <= today
+    except ValueError:
+        return False
+
+
+def _iter_overdue(events, today):
+    """Для каждого мероприятия возвращает признак просроченного срока"""
+    for event in events:
+        deadline_match = _RE_DEADLINE.search(event)
+        yield bool(deadline_match) and check_deadline(deadline_match.group(1), today)
 
 
 class ProtocolApp(wx.Frame):
@@ -12,9 +32,13 @@ class ProtocolApp(wx.Frame):
 
         self.protocol_file = ""
         self.output_file = ""
+        self._protocol_cache = {}
+        self._generating = False
+        self._original_stdout = sys.stdout
         self.template_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Шаблон.docx")
 
         self.create_ui()
+        self.Bind(wx.EVT_CLOSE, self.on_close)
         self.Centre()
         self.Show()
 
@@ -99,6 +123,10 @@ class ProtocolApp(wx.Frame):
         self.log_text = wx.TextCtrl(panel, style=wx.TE_MULTILINE | wx.TE_READONLY | wx.TE_RICH2)
         log_sizer.Add(self.log_text, 1, wx.ALL | wx.EXPAND, 5)
 
+        # Единый буфер лога: и сообщения приложения, и вывод print() идут
+        # через него в порядке поступления
+        self.log_writer = TextRedirector(self.log_text)
+
         main_sizer.Add(log_sizer, 1, wx.EXPAND | wx.ALL, 5)
 
         panel.SetSizer(main_sizer)
@@ -152,27 +180,31 @@ class ProtocolApp(wx.Frame):
             self.output_text.SetValue(self.output_file)
             self.check_buttons_state()
 
+    def _load_protocol(self, path):
+        """Читает протокол один раз и кэширует данные до изменения файла"""
+        key = (path, os.path.getmtime(path))
+        data = self._protocol_cache.get(key)
+        if data is None:
+            protocol_num, date = extract_protocol_data(path)
+            events = parse_protocol(path)
+            data = (protocol_num, date, events)
+            self._protocol_cache = {key: data}
+        return data
+
     def update_protocol_info(self):
         if not self.protocol_file:
             self.info_text.SetLabel("Выберите файл протокола для отображения информации")
             return
 
         try:
-            protocol_num, date = extract_protocol_data(self.protocol_file)
-            events = parse_protocol(self.protocol_file)
+            protocol_num, date, events = self._load_protocol(self.protocol_file)
 
             if protocol_num and date:
                 info = f"Протокол №{protocol_num} от {date}\n"
                 info += f"Найдено мероприятий: {len(events)}"
 
                 # Проверяем просроченные мероприятия
-                overdue_count = 0
-                for event in events:
-                    deadline_match = re.search(r'Срок: (\d{2}.\d{2}.\d{4})', event)
-                    if deadline_match:
-                        deadline_str = deadline_match.group(1)
-                        if check_deadline(deadline_str):
-                            overdue_count += 1
+                overdue_count = sum(_iter_overdue(events, _date.today()))
 
                 if overdue_count > 0:
                     info += f" (просрочено: {overdue_count})"
@@ -192,7 +224,7 @@ class ProtocolApp(wx.Frame):
             return
 
         try:
-            events = parse_protocol(self.protocol_file)
+            _, _, events = self._load_protocol(self.protocol_file)
             self.show_events_preview(events)
         except Exception as e:
             wx.MessageBox(f"Ошибка при предпросмотре мероприятий: {str(e)}",
@@ -230,45 +262,75 @@ class ProtocolApp(wx.Frame):
             )
             return
 
-        try:
-            # Сохраняем оригинальный stdout для восстановления
-            original_stdout = sys.stdout
-
-            # Перенаправляем stdout для захвата сообщений
-            sys.stdout = TextRedirector(self.log_text)
-
-            self.log_message("Начало генерации отчета...")
-            self.log_message(f"Протокол: {self.protocol_file}")
-            self.log_message(f"Шаблон: {self.template_file}")
-            self.log_message(f"Выходной файл: {self.output_file}")
+        self.log_message("Начало генерации отчета...")
+        self.log_message(f"Протокол: {self.protocol_file}")
+        self.log_message(f"Шаблон: {self.template_file}")
+        self.log_message(f"Выходной файл: {self.output_file}")
 
-            self.generate_btn.Disable()
+        self._generating = True
+        self.generate_btn.Disable()
 
+        # Временно: create_report пишет сообщения через print(), поэтому
+        # stdout перенаправляется в лог на время генерации. Перенаправление
+        # действует на весь процесс; убрать его, когда create_report будет
+        # принимать log_callback. Подмена и восстановление - только в потоке
+        # интерфейса
+        self._original_stdout = sys.stdout
+        sys.stdout = self.log_writer
+
+        # Генерация выполняется в фоновом потоке, чтобы интерфейс не зависал
+        threading.Thread(target=self._do_generate,
+                         args=(self.template_file, self.protocol_file, self.output_file),
+                         daemon=True).start()
+
+    def _do_generate(self, template_file, protocol_file, output_file):
+        success = False
+        error = None
+        try:
             # Вызываем функцию генерации отчета
-            create_report(self.template_file, self.protocol_file, self.output_file)
-
-            self.log_message("Генерация отчета завершена успешно!")
+            create_report(template_file, protocol_file, output_file)
+            success = True
+        except Exception as e:
+            error = e
+        finally:
+            wx.CallAfter(self._on_generate_done, output_file, success, error)
 
-            # Показываем сообщение об успехе
-            result_dialog = wx.MessageDialog(
-                self,
-                f"Отчет успешно сохранен в файл:\n{self.output_file}\n\nХотите открыть полученный файл?",
-                "Успех",
-                wx.YES_NO | wx.ICON_INFORMATION
-            )
+    def _on_generate_done(self, output_file, success, error):
+        # Восстанавливаем оригинальный stdout
+        sys.stdout = self._original_stdout
 
-            if result_dialog.ShowModal() == wx.ID_YES:
-                # Открываем файл в ассоциированном приложении
-                os.startfile(self.output_file)
+        self._generating = False
+        self.check_buttons_state()
 
-        except Exception as e:
-            error_msg = f"Ошибка при генерации отчета: {str(e)}"
+        if not success:
+            reason = str(error) if error is not None else "генерация прервана"
+            error_msg = f"Ошибка при генерации отчета: {reason}"
             self.log_message(error_msg)
             wx.MessageBox(error_msg, "Ошибка", wx.OK | wx.ICON_ERROR)
-        finally:
-            # Восстанавливаем оригинальный stdout
-            sys.stdout = original_stdout
-            self.generate_btn.Enable()
+            return
+
+        self.log_message("Генерация отчета завершена успешно!")
+
+        # Показываем сообщение об успехе
+        result_dialog = wx.MessageDialog(
+            self,
+            f"Отчет успешно сохранен в файл:\n{output_file}\n\nХотите открыть полученный файл?",
+            "Успех",
+            wx.YES_NO | wx.ICON_INFORMATION
+        )
+
+        if result_dialog.ShowModal() == wx.ID_YES:
+            # Открываем файл в ассоциированном приложении
+            os.startfile(output_file)
+
+    def on_close(self, event):
+        # Закрытие окна завершает приложение и прерывает запись отчета
+        if self._generating and event.CanVeto():
+            wx.MessageBox("Дождитесь завершения генерации отчета.",
+                          "Внимание", wx.OK | wx.ICON_WARNING)
+            event.Veto()
+            return
+        event.Skip()
 
     def check_buttons_state(self):
         has_protocol = bool(self.protocol_file)
@@ -276,7 +338,8 @@ class ProtocolApp(wx.Frame):
         has_template = os.path.exists(self.template_file)
 
         self.preview_btn.Enable(has_protocol)
-        self.generate_btn.Enable(has_protocol and has_output and has_template)
+        self.generate_btn.Enable(has_protocol and has_output and has_template
+                                 and not self._generating)
 
         if has_protocol and has_output and not has_template:
             self.generate_btn.SetToolTip("Файл шаблона не найден в корневой папке")
@@ -285,18 +348,40 @@ class ProtocolApp(wx.Frame):
 
     def log_message(self, message):
         timestamp = wx.DateTime.Now().FormatTime() + " " + wx.DateTime.Now().FormatDate()
-        self.log_text.AppendText(f"[{timestamp}] {message}\n")
+        self.log_writer.write(f"[{timestamp}] {message}\n")
 
 
 class TextRedirector(object):
     def __init__(self, text_ctrl):
         self.text_ctrl = text_ctrl
+        self._buf = []
+        self._pending = False
+        # Запись идет из фонового потока, вывод в окно - из потока интерфейса
+        self._lock = threading.Lock()
 
     def write(self, string):
-        wx.CallAfter(self.text_ctrl.AppendText, string)
+        with self._lock:
+            self._buf.append(string)
+            self._schedule_flush()
+
+    def _schedule_flush(self):
+        # Вызывается под self._lock
+        if not self._pending:
+            self._pending = True
+            wx.CallAfter(self._flush)
+
+    def _flush(self):
+        with self._lock:
+            self._pending = False
+            buf, self._buf = self._buf, []
+        # Окно могло быть закрыто до обработки отложенного вызова
+        if buf and self.text_ctrl:
+            self.text_ctrl.AppendText("".join(buf))
 
     def flush(self):
-        pass
+        with self._lock:
+            if self._buf:
+                self._schedule_flush()
 
 
 if __name__ == "__main__":